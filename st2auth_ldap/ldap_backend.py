@@ -19,9 +19,13 @@ from __future__ import absolute_import
 
 import os
 import logging
+import queue
+import threading
 
 import ldap
+import ldap.dn
 import ldap.filter
+from ldap.controls import SimplePagedResultsControl
 import ldapurl
 
 from cachetools import TTLCache
@@ -29,7 +33,8 @@ from cachetools import TTLCache
 from st2auth.backends.constants import AuthBackendCapability
 
 __all__ = [
-    'LDAPAuthenticationBackend'
+    'LDAPAuthenticationBackend',
+    'LDAPConnectionPool'
 ]
 
 LOG = logging.getLogger(__name__)
@@ -40,19 +45,61 @@ SEARCH_SCOPES = {
     'subtree': ldapurl.LDAP_SCOPE_SUBTREE
 }
 
-VALID_GROUP_DNS_CHECK_VALUES = [
+VALID_SEARCH_SCOPES = frozenset(SEARCH_SCOPES)
+
+VALID_GROUP_DNS_CHECK_VALUES = frozenset([
     'and',
     'or'
-]
+])
+
+# Functions which verify that the user is a member of the required groups for each check behavior.
+# "and" - user needs to be a member of all the required groups.
+# "or" - user needs to be a member of one or more of the required groups.
+GROUP_DNS_CHECK_FUNCS = {
+    'and': frozenset.issubset,
+    'or': frozenset.intersection
+}
 
 # The query on member is included for groupOfNames.
 # The query on uniqueMember is included for groupOfUniqueNames.
 # The query on memberUid is included for posixGroup.
 #
-# Note: To avoid injection attacks the final query needs to be assembled ldap.filter.filter_format
-# method and *NOT* by doing simple string formating / concatenation (method ensures filter values
-# are correctly escaped).
-USER_GROUP_MEMBERSHIP_QUERY = '(|(&(objectClass=*)(|(member={user_dn})(uniqueMember={user_dn})(memberUid={username}))))'  # noqa: E501
+# Note: The query intentionally doesn't include an objectClass clause. objectClass is not indexed
+# on some servers (e.g. Active Directory) and such clause would force the server to visit every
+# entry under the base OU instead of using the index on the membership attributes. On Active
+# Directory "group_pattern" option can be used to restrict the query with an indexed
+# objectCategory clause (e.g. "(&(objectCategory=group)(|(member={user_dn})...))").
+#
+# Note: To avoid injection attacks values are escaped using ldap.filter.escape_filter_chars
+# method before they are interpolated into the query and *NOT* by doing simple string formating /
+# concatenation (method ensures filter values are correctly escaped).
+USER_GROUP_MEMBERSHIP_QUERY = '(|(member={user_dn})(uniqueMember={user_dn})(memberUid={username}))'
+
+# User attributes which are retrieved by default when looking up a user record. Attribute specified
+# using "id_attr" option is also retrieved.
+DEFAULT_USER_ATTRIBUTES = [
+    'cn',
+    'mail',
+    'displayName'
+]
+
+# Special OID which tells the server not to return any attributes (RFC 4511, section 4.5.1.8). We
+# often only need a DN of the matching user or group entry so there is no need to transfer all the
+# attributes (e.g. member) which can contain thousands of values for large groups.
+NO_ATTRIBUTES = ['1.1']
+
+# Maximum number of required groups for which membership is verified using the compare operation
+# (when "use_compare_operation" option is enabled). Each group needs up to one compare request per
+# membership attribute so for a larger number of groups a single group query is cheaper.
+COMPARE_THRESHOLD = 4
+
+# Membership attributes which are compared with the user DN / username when the compare operation
+# is used. Those match the attributes used in USER_GROUP_MEMBERSHIP_QUERY.
+COMPARE_MEMBERSHIP_ATTRIBUTES = [
+    ('member', 'user_dn'),
+    ('uniqueMember', 'user_dn'),
+    ('memberUid', 'username')
+]
 
 
 class LDAPAuthenticationBackend(object):
@@ -62,13 +109,25 @@ class LDAPAuthenticationBackend(object):
         AuthBackendCapability.HAS_GROUP_INFORMATION
     )
 
+    # TLS options are global (process-wide) so they are only set when they differ from the ones
+    # which have already been set by any of the backend instances.
+    _applied_tls_options = {}
+    _applied_tls_options_lock = threading.Lock()
+
     def __init__(self, bind_dn, bind_password, base_ou, group_dns, host, port=389,
                  scope='subtree', id_attr=None, account_pattern='', group_pattern='',
                  use_ssl=False, use_tls=False, cacert=None, network_timeout=10.0,
                  chase_referrals=False, debug=False, client_options=None,
                  group_dns_check='and', cache_user_groups_response=True,
                  cache_user_groups_cache_ttl=120, cache_user_groups_cache_max_size=100,
-                 base_ou_group=None):
+                 base_ou_group=None, user_attributes=None, use_memberof_attribute=False,
+                 memberof_attribute='memberOf', group_dn_attribute=None,
+                 connection_pool_max_size=8, cache_user_response=True,
+                 cache_user_cache_ttl=60, cache_user_cache_max_size=1024,
+                 cache_user_negative_cache_ttl=10, user_dn_template=None,
+                 user_search_scope=None, size_limit=2, time_limit=5,
+                 concurrent_user_bind=False, group_query_page_size=0,
+                 use_compare_operation=False):
         if not bind_dn:
             raise ValueError('Bind DN to query the LDAP server is not provided.')
 
@@ -78,12 +137,38 @@ class LDAPAuthenticationBackend(object):
         if not host:
             raise ValueError('Hostname for the LDAP server is not provided.')
 
+        if not base_ou:
+            raise ValueError('Base OU for the LDAP query is not provided.')
+
+        if scope not in VALID_SEARCH_SCOPES:
+            raise ValueError('Scope value for the LDAP query must be one of '
+                             '%s.' % (', '.join(sorted(VALID_SEARCH_SCOPES))))
+
+        if user_search_scope and user_search_scope not in VALID_SEARCH_SCOPES:
+            raise ValueError('User search scope value for the LDAP query must be one of '
+                             '%s.' % (', '.join(sorted(VALID_SEARCH_SCOPES))))
+
+        if not group_dns:
+            raise ValueError('One or more user groups must be specified.')
+
+        if group_dns_check not in VALID_GROUP_DNS_CHECK_VALUES:
+            valid_values = ', '.join(sorted(VALID_GROUP_DNS_CHECK_VALUES))
+            raise ValueError('Invalid value "%s" for group_dns_check option. Valid values are: '
+                             '%s.' % (group_dns_check, valid_values))
+
+        if use_ssl and use_tls:
+            raise ValueError('SSL and TLS cannot be both true.')
+
+        if cacert and not os.path.isfile(cacert):
+            raise ValueError('Unable to find the cacert file "%s" for the LDAP connection.' %
+                             (cacert))
+
         self._bind_dn = bind_dn
         self._bind_password = bind_password
         self._host = host
 
         if port:
-            self._port = port
+            self._port = int(port)
         elif not port and not use_ssl:
             LOG.warn('Default port 389 is used for the LDAP query.')
             self._port = 389
@@ -91,13 +176,6 @@ class LDAPAuthenticationBackend(object):
             LOG.warn('Default port 636 is used for the LDAP query over SSL.')
             self._port = 636
 
-        if use_ssl and use_tls:
-            raise ValueError('SSL and TLS cannot be both true.')
-
-        if cacert and not os.path.isfile(cacert):
-            raise ValueError('Unable to find the cacert file "%s" for the LDAP connection.' %
-                             (cacert))
-
         self._use_ssl = use_ssl
         self._use_tls = use_tls
         self._cacert = cacert
@@ -106,34 +184,69 @@ class LDAPAuthenticationBackend(object):
         self._debug = debug
         self._client_options = client_options
 
-        if not account_pattern and not id_attr:
-            LOG.warn('Default to "uid" for the user attribute in the LDAP query.')
+        # Option names can also be specified as strings (e.g. in the config file)
+        self._client_options_items = [(int(option_name), option_value)
+                                      for option_name, option_value
+                                      in (client_options or {}).items()]
 
-        if not base_ou:
-            raise ValueError('Base OU for the LDAP query is not provided.')
+        # Use CA cert bundle to validate certificate if present.
+        if not use_ssl and not use_tls:
+            self._tls_options = {}
+        elif cacert:
+            self._tls_options = {ldap.OPT_X_TLS_CACERTFILE: cacert}
+        else:
+            self._tls_options = {ldap.OPT_X_TLS_REQUIRE_CERT: ldap.OPT_X_TLS_NEVER}
 
-        if scope not in SEARCH_SCOPES.keys():
-            raise ValueError('Scope value for the LDAP query must be one of '
-                             '%s.' % str(SEARCH_SCOPES.keys()))
+        protocol = 'ldaps' if use_ssl else 'ldap'
+        self._endpoint = ','.join(['%s://%s:%d' % (protocol, host_name, self._port)
+                                   for host_name in host.split(',')])
+
+        if not account_pattern and not id_attr:
+            LOG.warn('Default to "uid" for the user attribute in the LDAP query.')
 
         default_account_pattern = '{id_attr}={{username}}'.format(id_attr=id_attr or 'uid')
         self._account_pattern = account_pattern or default_account_pattern
+        self._user_dn_template = user_dn_template
         self._group_pattern = group_pattern or USER_GROUP_MEMBERSHIP_QUERY
         self._base_ou = base_ou
         self._scope = SEARCH_SCOPES[scope]
+        self._user_search_scope = SEARCH_SCOPES[user_search_scope or scope]
+
+        # Limits for the user query. Query which matches more than "size_limit" entries is
+        # aborted by the server since only a single user entry is expected anyway.
+        self._size_limit = int(size_limit or 0)
+        self._time_limit = int(time_limit or -1)
+
+        if user_attributes:
+            self._user_attributes = list(user_attributes)
+        else:
+            # Attribute which identifies the user ("uid" if not specified) is always retrieved
+            self._user_attributes = list(DEFAULT_USER_ATTRIBUTES)
+
+            if (id_attr or 'uid') not in self._user_attributes:
+                self._user_attributes.append(id_attr or 'uid')
 
         self._base_ou_group = base_ou_group or base_ou
-        if not group_dns:
-            raise ValueError('One or more user groups must be specified.')
 
-        if group_dns_check not in VALID_GROUP_DNS_CHECK_VALUES:
-            valid_values = ', '.join(VALID_GROUP_DNS_CHECK_VALUES)
-            raise ValueError('Invalid value "%s" for group_dns_check option. Valid values are: '
-                             '%s.' % (group_dns_check, valid_values))
+        # Groups read from the "memberOf" attribute are limited to the groups under the group base
+        # OU, same as the groups which are retrieved using the group query
+        self._base_ou_group_rdns = self._normalize_dn(self._base_ou_group)
 
         self._group_dns_check = group_dns_check
+        self._group_dns_check_func = GROUP_DNS_CHECK_FUNCS[group_dns_check]
         self._group_dns = group_dns
 
+        # Assume group entries are not case sensitive.
+        self._required_groups_lower = frozenset(group_dn.casefold() for group_dn in group_dns)
+
+        self._use_memberof_attribute = use_memberof_attribute
+        self._memberof_attribute = memberof_attribute
+        self._group_dn_attribute = group_dn_attribute
+        self._concurrent_user_bind = concurrent_user_bind
+        self._group_query_page_size = int(group_query_page_size or 0)
+        self._use_compare_operation = (use_compare_operation and
+                                       len(group_dns) <= COMPARE_THRESHOLD)
+
         self._cache_user_groups_response = cache_user_groups_response
         self._cache_user_groups_cache_ttl = int(cache_user_groups_cache_ttl)
         self._cache_user_groups_cache_max_size = int(cache_user_groups_cache_max_size)
@@ -145,24 +258,44 @@ class LDAPAuthenticationBackend(object):
         else:
             self._user_groups_cache = None
 
-    def authenticate(self, username, password):
-        connection = None
+        self._cache_user_response = cache_user_response
+        self._cache_user_cache_ttl = int(cache_user_cache_ttl)
+        self._cache_user_cache_max_size = int(cache_user_cache_max_size)
+        self._cache_user_negative_cache_ttl = int(cache_user_negative_cache_ttl)
+
+        # Caches which store LDAP user record for a particular user and a result of lookups for
+        # users which don't exist. Negative results are cached separately with a shorter TTL so
+        # repeated attempts for non-existent users don't result in a query each time.
+        if self._cache_user_response:
+            self._user_cache = TTLCache(maxsize=self._cache_user_cache_max_size,
+                                        ttl=self._cache_user_cache_ttl)
+            self._user_negative_cache = TTLCache(maxsize=self._cache_user_cache_max_size,
+                                                 ttl=self._cache_user_negative_cache_ttl)
+        else:
+            self._user_cache = None
+            self._user_negative_cache = None
+
+        # Caches are not thread-safe
+        self._cache_lock = threading.RLock()
+
+        # Pool of connections which are bound with the service account
+        self._connection_pool = LDAPConnectionPool(
+            connection_factory=self._init_service_connection,
+            max_size=int(connection_pool_max_size),
+            bind_func=self._bind_service_account)
 
+    def authenticate(self, username, password):
         if not password:
             raise ValueError('password cannot be empty')
 
-        try:
-            # Instantiate connection object and bind with service account.
-            try:
-                connection = self._init_connection()
-                connection.simple_bind_s(self._bind_dn, self._bind_password)
-            except Exception:
-                LOG.exception('Failed to bind with "%s".' % self._bind_dn)
-                return False
+        user_connection = None
+        user_connection_bound = False
 
-            # Search for user and fetch the DN of the record.
+        try:
+            # Search for user and fetch the DN of the record. Connection bound with the service
+            # account is retrieved from the pool.
             try:
-                user_dn = self._get_user_dn(connection=connection, username=username)
+                user_dn = self._connection_pool.run(self._get_user_dn, username=username)
             except ValueError as e:
                 LOG.exception(str(e))
                 return False
@@ -170,41 +303,79 @@ class LDAPAuthenticationBackend(object):
                 LOG.exception('Unexpected error when querying for user "%s".' % username)
                 return False
 
+            # Send the bind request with the user DN and password without waiting for the result
+            # so it's processed by the server while user group membership is being queried.
+            if self._concurrent_user_bind:
+                try:
+                    user_connection, bind_msgid = self._send_user_bind(user_dn=user_dn,
+                                                                       password=password)
+                except Exception:
+                    LOG.exception('Failed authenticating user "%s".' % username)
+                    return False
+
             # Search if user is member of pre-defined groups.
             try:
-                user_groups = self._get_groups_for_user(connection=connection, user_dn=user_dn,
-                                                        username=username)
-
-                # Assume group entries are not case sensitive.
-                user_groups = set([entry.lower() for entry in user_groups])
-                required_groups = set([entry.lower() for entry in self._group_dns])
-
-                result = self._verify_user_group_membership(username=username,
-                                                            required_groups=required_groups,
-                                                            user_groups=user_groups,
-                                                            check_behavior=self._group_dns_check)
-                if not result:
-                    return False
+                if self._use_compare_operation:
+                    get_groups_func = self._get_required_groups_using_compare
+                elif self._group_dn_attribute:
+                    get_groups_func = self._get_required_groups_for_user
+                else:
+                    get_groups_func = self._get_groups_for_user
+
+                # When "or" behavior is used, there is no need to retrieve the remaining groups
+                # once user is found to be a member of one of the required groups.
+                user_groups = self._connection_pool.run(get_groups_func, user_dn=user_dn,
+                                                        username=username,
+                                                        stop_early=self._group_dns_check == 'or')
             except Exception:
                 LOG.exception('Unexpected error when querying membership for user "%s".' % username)
                 return False
 
-            self._clear_connection(connection)
+            # Assume group entries are not case sensitive.
+            user_groups = frozenset(map(str.casefold, user_groups))
 
-            # Authenticate with the user DN and password.
+            result = self._verify_user_group_membership(username=username,
+                                                        required_groups=self._required_groups_lower,
+                                                        user_groups=user_groups)
+            if not result:
+                return False
+
+            # Authenticate with the user DN and password. Already established connection is bound
+            # with the user credentials instead of opening a new one. Since the bind changes
+            # identity of the connection, it's bound with the service account again before it's
+            # returned to the pool.
             try:
-                connection = self._init_connection()
-                connection.simple_bind_s(user_dn, password)
+                bind_completed = False
+
+                if self._concurrent_user_bind:
+                    user_connection_bound = True
+
+                    try:
+                        user_connection.result3(bind_msgid)
+                        bind_completed = True
+                    except (ldap.SERVER_DOWN, ldap.CONNECT_ERROR):
+                        # Pooled connection has been closed by the server while idle, fall back
+                        # to a synchronous bind which is retried using a new connection
+                        LOG.debug('Pooled LDAP connection is not usable, retrying user bind')
+                        self._connection_pool.discard(user_connection)
+                        user_connection = None
+
+                if not bind_completed:
+                    self._connection_pool.run(self._bind_user, rebind=True, user_dn=user_dn,
+                                              password=password)
+
                 LOG.info('Successfully authenticated user "%s".' % username)
                 return True
             except Exception:
                 LOG.exception('Failed authenticating user "%s".' % username)
                 return False
-        except ldap.LDAPError:
-            LOG.exception('Unexpected LDAP error.')
-            return False
         finally:
-            self._clear_connection(connection)
+            # Connection with an outstanding bind request can't be safely reused
+            if user_connection is not None:
+                if user_connection_bound:
+                    self._connection_pool.release(user_connection, rebind=True)
+                else:
+                    self._connection_pool.discard(user_connection)
 
         return False
 
@@ -214,18 +385,11 @@ class LDAPAuthenticationBackend(object):
 
         :rtype: ``dict``
         """
-        connection = None
-
         try:
-            connection = self._init_connection()
-            connection.simple_bind_s(self._bind_dn, self._bind_password)
-
-            _, user_info = self._get_user(connection=connection, username=username)
+            _, user_info = self._connection_pool.run(self._get_user, username=username)
         except Exception:
             LOG.exception('Failed to retrieve details for user "%s"' % (username))
             return None
-        finally:
-            self._clear_connection(connection)
 
         user_info = dict(user_info)
         return user_info
@@ -241,36 +405,38 @@ class LDAPAuthenticationBackend(object):
         if groups is not None:
             return groups
 
-        connection = None
-
         try:
-            connection = self._init_connection()
-            connection.simple_bind_s(self._bind_dn, self._bind_password)
-
-            user_dn = self._get_user_dn(connection=connection, username=username)
-            groups = self._get_groups_for_user(connection=connection, user_dn=user_dn,
-                                               username=username)
+            _, groups = self._connection_pool.run(self._get_user_dn_and_groups,
+                                                  username=username)
         except Exception:
             LOG.exception('Failed to retrieve groups for user "%s"' % (username))
             return None
-        finally:
-            self._clear_connection(connection)
 
         # Store result in cache (if caching is enabled)
         self._set_user_groups_in_cache(username=username, groups=groups)
 
         return groups
 
+    def invalidate_user(self, username):
+        """
+        Remove all the cached information for the provided user.
+        """
+        with self._cache_lock:
+            if self._cache_user_response:
+                for cache_key in list(self._user_cache.keys()):
+                    if cache_key[0] == username:
+                        self._user_cache.pop(cache_key, None)
+
+                self._user_negative_cache.pop(username, None)
+
+            if self._cache_user_groups_response:
+                self._user_groups_cache.pop(username, None)
+
     def _init_connection(self):
         """
         Initialize connection to the LDAP server.
         """
-        # Use CA cert bundle to validate certificate if present.
-        if self._use_ssl or self._use_tls:
-            if self._cacert:
-                ldap.set_option(ldap.OPT_X_TLS_CACERTFILE, self._cacert)
-            else:
-                ldap.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_NEVER)
+        self._set_tls_options()
 
         if self._debug:
             trace_level = 2
@@ -278,13 +444,7 @@ class LDAPAuthenticationBackend(object):
             trace_level = 0
 
         # Setup connection and options.
-        protocol = 'ldaps' if self._use_ssl else 'ldap'
-        hosts = self._host.split(',')
-        for i in range(len(hosts)):
-            hosts[i] = '%s://%s:%d' % (protocol, hosts[i], int(self._port))
-
-        endpoint = ','.join(hosts)
-        connection = ldap.initialize(endpoint, trace_level=trace_level)
+        connection = ldap.initialize(self._endpoint, trace_level=trace_level)
         connection.set_option(ldap.OPT_DEBUG_LEVEL, 255)
         connection.set_option(ldap.OPT_PROTOCOL_VERSION, ldap.VERSION3)
         connection.set_option(ldap.OPT_NETWORK_TIMEOUT, self._network_timeout)
@@ -294,15 +454,86 @@ class LDAPAuthenticationBackend(object):
         else:
             connection.set_option(ldap.OPT_REFERRALS, 0)
 
-        client_options = self._client_options or {}
-        for option_name, option_value in client_options.items():
-            connection.set_option(int(option_name), option_value)
+        for option_name, option_value in self._client_options_items:
+            connection.set_option(option_name, option_value)
 
         if self._use_tls:
             connection.start_tls_s()
 
         return connection
 
+    def _set_tls_options(self):
+        """
+        Set global TLS options which are used to validate the server certificate, unless they
+        have already been set.
+        """
+        cls = LDAPAuthenticationBackend
+
+        with cls._applied_tls_options_lock:
+            for option, value in self._tls_options.items():
+                if cls._applied_tls_options.get(option) == value:
+                    continue
+
+                ldap.set_option(option, value)
+                cls._applied_tls_options[option] = value
+
+    def _init_service_connection(self):
+        """
+        Initialize connection to the LDAP server and bind with the service account.
+        """
+        connection = self._init_connection()
+
+        try:
+            self._bind_service_account(connection)
+        except Exception:
+            LOG.exception('Failed to bind with "%s".' % self._bind_dn)
+            self._clear_connection(connection)
+            raise
+
+        return connection
+
+    def _bind_service_account(self, connection):
+        """
+        Bind provided connection with the service account.
+        """
+        connection.simple_bind_s(self._bind_dn, self._bind_password)
+
+    def _send_user_bind(self, user_dn, password):
+        """
+        Send bind request with the user credentials using a pooled connection without waiting for
+        the result.
+
+        If the pooled connection is not usable, it's discarded and the request is retried once
+        using a new connection.
+
+        :return: Tuple of (connection, bind request message id).
+        :rtype: ``tuple``
+        """
+        connection = self._connection_pool.acquire()
+
+        try:
+            return connection, connection.simple_bind(user_dn, password)
+        except (ldap.SERVER_DOWN, ldap.CONNECT_ERROR):
+            LOG.debug('Pooled LDAP connection is not usable, retrying with a new connection')
+            self._connection_pool.discard(connection)
+        except Exception:
+            self._connection_pool.discard(connection)
+            raise
+
+        connection = self._init_service_connection()
+
+        try:
+            return connection, connection.simple_bind(user_dn, password)
+        except Exception:
+            self._connection_pool.discard(connection)
+            raise
+
+    def _bind_user(self, connection, user_dn, password):
+        """
+        Bind provided connection with the user credentials.
+        """
+        connection.simple_bind_s(user_dn, password)
+
     def _clear_connection(self, connection):
         """
         Unbind and close connection to the LDAP server.
@@ -310,42 +541,107 @@ class LDAPAuthenticationBackend(object):
         if connection:
             connection.unbind_s()
 
+    def _get_user_dn_and_groups(self, connection, username):
+        """
+        Retrieve DN of the user record and a list of groups user is a member of.
+
+        :rtype: ``tuple`` (``user_dn``, ``list`` of ``str``)
+        """
+        user_dn = self._get_user_dn(connection=connection, username=username)
+        groups = self._get_groups_for_user(connection=connection, user_dn=user_dn,
+                                           username=username)
+        return user_dn, groups
+
     def _get_user_dn(self, connection, username):
-        user_dn, _ = self._get_user(connection=connection, username=username)
+        # If DN can be composed from the username, there is no need to query the server
+        if self._user_dn_template:
+            return self._format_user_dn(username=username)
+
+        # Only DN is needed so no attributes are requested
+        user_dn, _ = self._get_user(connection=connection, username=username,
+                                    attrlist=NO_ATTRIBUTES)
         return user_dn
 
-    def _get_user(self, connection, username):
+    def _format_user_dn(self, username):
+        """
+        Compose user DN using "user_dn_template" option.
+
+        Note: This method escapes ``username`` so it can safely be used as an attribute value in
+        the DN.
+        """
+        escaped_username = ldap.dn.escape_dn_chars(username)
+        user_dn = self._user_dn_template.format(username=escaped_username)
+        return user_dn
+
+    def _get_user(self, connection, username, attrlist=None):
         """
         Retrieve LDAP user record for the provided username.
 
         Note: This method escapes ``username`` so it can safely be used as a filter in the query.
 
+        :param attrlist: List of attributes to retrieve. If not provided, attributes specified
+                         using "user_attributes" option are retrieved.
+        :type attrlist: ``list`` of ``str``
+
         :rtype: ``tuple`` (``user_dn``, ``user_info_dict``)
         """
-        username = ldap.filter.escape_filter_chars(username)
-        query = self._account_pattern.format(username=username)
-        result = connection.search_s(self._base_ou, self._scope, query, [])
+        if attrlist is None:
+            attrlist = self._user_attributes
 
-        if result:
-            entries = [entry for entry in result if entry[0] is not None]
+        # First try to get result from a local in memory cache
+        cache_key = (username, tuple(attrlist))
+        user_tuple = self._get_user_from_cache(username=username, cache_key=cache_key)
+        if user_tuple is not None:
+            return user_tuple
+
+        escaped_username = ldap.filter.escape_filter_chars(username)
+        query = self._account_pattern.format(username=escaped_username)
+
+        if self._user_dn_template:
+            # DN is known so only the user record itself needs to be read
+            base = self._format_user_dn(username=username)
+            scope = ldap.SCOPE_BASE
         else:
-            entries = []
+            base = self._base_ou
+            scope = self._user_search_scope
+
+        try:
+            result = connection.search_ext_s(base, scope, query, attrlist,
+                                             timeout=self._time_limit,
+                                             sizelimit=self._size_limit)
+        except ldap.NO_SUCH_OBJECT:
+            result = []
+        except ldap.SIZELIMIT_EXCEEDED:
+            msg = ('More than one users identified for "%s".' % (query))
+            raise ValueError(msg)
 
-        if len(entries) <= 0:
+        # Search continuation references are returned as entries without a DN
+        entries = (entry for entry in result or [] if entry[0] is not None)
+        user_tuple = next(entries, None)
+
+        if user_tuple is None:
             msg = ('Unable to identify user for "%s".' % (query))
+            self._set_user_in_negative_cache(username=username, msg=msg)
             raise ValueError(msg)
 
-        if len(entries) > 1:
+        if next(entries, None) is not None:
             msg = ('More than one users identified for "%s".' % (query))
             raise ValueError(msg)
 
-        user_tuple = entries[0]
+        # Store result in cache (if caching is enabled)
+        self._set_user_in_cache(username=username, cache_key=cache_key, user_tuple=user_tuple)
+
         return user_tuple
 
-    def _get_groups_for_user(self, connection, user_dn, username):
+    def _get_groups_for_user(self, connection, user_dn, username, stop_early=False):
         """
         Return a list of all the groups user is a member of.
 
+        :param stop_early: True to stop retrieving groups as soon as one of the required groups
+                           is found (only used with paged group query). In such case, result is
+                           not stored in the cache.
+        :type stop_early: ``bool``
+
         :rtype: ``list`` of ``str``
         """
         # First try to get result from a local in memory cache
@@ -353,56 +649,257 @@ class LDAPAuthenticationBackend(object):
         if groups is not None:
             return groups
 
+        complete = True
+
+        if self._use_memberof_attribute:
+            groups = self._get_groups_from_memberof_attribute(connection=connection,
+                                                              user_dn=user_dn)
+
+        if groups is None:
+            query = self._get_group_membership_query(user_dn=user_dn, username=username)
+            groups, complete = self._search_groups(connection=connection, query=query,
+                                                   stop_early=stop_early)
+
+        # Store result in cache (if caching is enabled)
+        if complete:
+            self._set_user_groups_in_cache(username=username, groups=groups)
+
+        return groups
+
+    def _get_required_groups_for_user(self, connection, user_dn, username, stop_early=False):
+        """
+        Return a list of groups user is a member of, limited to the groups specified using
+        "group_dns" option.
+
+        Only required groups are requested from the server which means the result is never
+        larger than the number of required groups, no matter how many groups user is a member of.
+        Since the result is not a complete list of user groups it's not stored in the cache.
+
+        :rtype: ``list`` of ``str``
+        """
+        # If the complete list of groups is already cached, there is no need to query the server
+        groups = self._get_user_groups_from_cache(username=username)
+        if groups is not None:
+            return groups
+
+        membership_query = self._get_group_membership_query(user_dn=user_dn, username=username)
+        group_dns_query = ''.join(['(%s=%s)' % (self._group_dn_attribute,
+                                                ldap.filter.escape_filter_chars(group_dn))
+                                   for group_dn in self._group_dns])
+        query = '(&%s(|%s))' % (membership_query, group_dns_query)
+        groups, _ = self._search_groups(connection=connection, query=query,
+                                        stop_early=stop_early)
+
+        return groups
+
+    def _get_required_groups_using_compare(self, connection, user_dn, username,
+                                           stop_early=False):
+        """
+        Return a list of groups user is a member of, limited to the groups specified using
+        "group_dns" option.
+
+        Instead of searching for groups, membership attributes of each required group are
+        compared with the user DN / username. Compare operation only returns a boolean and is
+        resolved using an index on the group entry so it's much cheaper than a search when there
+        are only a few required groups.
+
+        Since the result is not a complete list of user groups it's not stored in the cache.
+
+        :param stop_early: True to stop as soon as user is found to be a member of one of the
+                           required groups.
+        :type stop_early: ``bool``
+
+        :rtype: ``list`` of ``str``
+        """
+        # If the complete list of groups is already cached, there is no need to query the server
+        groups = self._get_user_groups_from_cache(username=username)
+        if groups is not None:
+            return groups
+
+        values = {
+            'user_dn': user_dn,
+            'username': username
+        }
+        groups = []
+
+        for group_dn in self._group_dns:
+            is_member = any(self._compare(connection=connection, dn=group_dn, attribute=attribute,
+                                          value=values[value_name])
+                            for attribute, value_name in COMPARE_MEMBERSHIP_ATTRIBUTES)
+
+            if is_member:
+                groups.append(group_dn)
+
+                if stop_early:
+                    break
+            elif self._group_dns_check == 'and':
+                # User needs to be a member of all the required groups so there is no need to
+                # check the remaining ones
+                break
+
+        return groups
+
+    def _compare(self, connection, dn, attribute, value):
+        """
+        Return True if the attribute of the entry with the provided DN contains the provided
+        value.
+
+        Missing entries and attributes are treated as no match.
+
+        :rtype: ``bool``
+        """
+        try:
+            return bool(connection.compare_s(dn, attribute, value))
+        except (ldap.NO_SUCH_OBJECT, ldap.NO_SUCH_ATTRIBUTE, ldap.UNDEFINED_TYPE,
+                ldap.INAPPROPRIATE_MATCHING):
+            return False
+
+    def _search_groups(self, connection, query, stop_early=False):
+        """
+        Return DNs of all the groups which match the provided query.
+
+        If "group_query_page_size" option is set, groups are retrieved in pages using the simple
+        paged results control (RFC 2696) which means the client never needs to hold more than a
+        single page in memory while it's being received and queries aren't rejected by servers
+        which limit the number of entries returned in a single response.
+
+        :param stop_early: True to stop retrieving pages as soon as a page contains one of the
+                           required groups.
+        :type stop_early: ``bool``
+
+        :return: Tuple of (list of group DNs, True if all the matching groups were retrieved).
+        :rtype: ``tuple``
+        """
+        if not self._group_query_page_size:
+            result = connection.search_ext_s(self._base_ou_group, self._scope, query,
+                                             NO_ATTRIBUTES)
+            groups = list(filter(None, (entry[0] for entry in result or [])))
+            return groups, True
+
+        page_control = SimplePagedResultsControl(True, size=self._group_query_page_size,
+                                                 cookie='')
+        groups = []
+
+        while True:
+            msgid = connection.search_ext(self._base_ou_group, self._scope, query,
+                                          NO_ATTRIBUTES, serverctrls=[page_control])
+            _, result, _, response_controls = connection.result3(msgid)
+
+            page_groups = list(filter(None, (entry[0] for entry in result or [])))
+            groups.extend(page_groups)
+
+            cookies = [control.cookie for control in response_controls or []
+                       if control.controlType == SimplePagedResultsControl.controlType]
+            cookie = cookies[0] if cookies else None
+
+            if stop_early and not self._required_groups_lower.isdisjoint(
+                    map(str.casefold, page_groups)):
+                # Abandon the paged search so the server can release its state (RFC 2696,
+                # section 3)
+                if cookie:
+                    cancel_control = SimplePagedResultsControl(True, size=0, cookie=cookie)
+                    msgid = connection.search_ext(self._base_ou_group, self._scope, query,
+                                                  NO_ATTRIBUTES, serverctrls=[cancel_control])
+                    connection.result3(msgid)
+
+                return groups, False
+
+            if not cookie:
+                break
+
+            page_control.cookie = cookie
+
+        return groups, True
+
+    def _get_group_membership_query(self, user_dn, username):
+        """
+        Return a query which matches all the groups user is a member of.
+        """
         filter_values = {
             'user_dn': ldap.filter.escape_filter_chars(user_dn),
             'username': ldap.filter.escape_filter_chars(username),
         }
         query = self._group_pattern.format(**filter_values)
-        result = connection.search_s(self._base_ou_group, self._scope, query, [])
+        return query
+
+    def _get_groups_from_memberof_attribute(self, connection, user_dn):
+        """
+        Return a list of groups user is a member of based on the "memberOf" attribute on the user
+        record.
+
+        Only groups under the group base OU ("base_ou_group" option) are returned. If the
+        attribute is not present on the user record, None is returned so the caller can fall back
+        to the group membership query.
+
+        :rtype: ``list`` of ``str``
+        """
+        result = connection.search_ext_s(user_dn, ldap.SCOPE_BASE, '(objectClass=*)',
+                                         [self._memberof_attribute])
+
+        for entry_dn, entry_attributes in result or []:
+            if entry_dn is None:
+                continue
+
+            values = entry_attributes.get(self._memberof_attribute, None)
+            if values is None:
+                break
 
-        if result:
-            groups = [entry[0] for entry in result if entry[0] is not None]
-        else:
             groups = []
 
-        # Store result in cache (if caching is enabled)
-        self._set_user_groups_in_cache(username=username, groups=groups)
+            for value in values:
+                group = value.decode('utf-8') if isinstance(value, bytes) else value
 
-        return groups
+                if not self._is_under_base_ou_group(dn=group):
+                    LOG.debug('Ignoring group "%s" which is not under the group base OU "%s"' %
+                              (group, self._base_ou_group))
+                    continue
+
+                groups.append(group)
+
+            return groups
 
-    def _verify_user_group_membership(self, username, required_groups, user_groups,
-                                      check_behavior='and'):
+        LOG.debug('Attribute "%s" not found on user record "%s", falling back to group query' %
+                  (self._memberof_attribute, user_dn))
+        return None
+
+    def _is_under_base_ou_group(self, dn):
         """
-        Validate that the user is a member of required groups based on the check behavior defined
-        in the config (and / or).
+        Return True if the entry with the provided DN is located under the group base OU.
         """
+        try:
+            rdns = self._normalize_dn(dn)
+        except ldap.DECODING_ERROR:
+            return False
 
-        if check_behavior == 'and':
-            additional_msg = ('user needs to be member of all the following groups "%s" for '
-                              'authentication to succeeed')
-        elif check_behavior == 'or':
-            additional_msg = ('user needs to be member of one or more of the following groups "%s" '
-                              'for authentication to succeeed')
+        base_rdns = self._base_ou_group_rdns
+        return len(rdns) > len(base_rdns) and rdns[-len(base_rdns):] == base_rdns
 
-        additional_msg = additional_msg % (str(list(required_groups)))
+    def _normalize_dn(self, dn):
+        """
+        Return a normalized form of the DN which doesn't depend on the DN formatting (whitespace,
+        escaping, case).
 
-        LOG.debug('Verifying user group membership using "%s" behavior (%s)' %
-                  (check_behavior, additional_msg))
+        :rtype: ``list`` of ``tuple``
+        """
+        return [tuple(sorted((attr_type.casefold(), attr_value.casefold())
+                             for attr_type, attr_value, _ in rdn))
+                for rdn in ldap.dn.str2dn(dn)]
 
-        if check_behavior == 'and':
-            if required_groups.issubset(user_groups):
-                return True
-        elif check_behavior == 'or':
-            if required_groups.intersection(user_groups):
-                return True
+    def _verify_user_group_membership(self, username, required_groups, user_groups):
+        """
+        Validate that the user is a member of required groups based on the check behavior defined
+        in the config (and / or).
+        """
+        result = bool(self._group_dns_check_func(required_groups, user_groups))
 
-        msg = ('Unable to verify membership for user "%s (required_groups=%s,'
-               'actual_groups=%s,check_behavior=%s)".' % (username, str(required_groups),
-                                                          str(user_groups), check_behavior))
-        LOG.exception(msg)
+        if not result:
+            msg = ('Unable to verify membership for user "%s (required_groups=%s,'
+                   'actual_groups=%s,check_behavior=%s)".' % (username, str(required_groups),
+                                                              str(user_groups),
+                                                              self._group_dns_check))
+            LOG.error(msg)
 
-        # Final safe guard
-        return False
+        return result
 
     def _get_user_groups_from_cache(self, username):
         """
@@ -412,7 +909,8 @@ class LDAPAuthenticationBackend(object):
             return None
 
         LOG.debug('Getting LDAP groups for user "%s" from cache' % (username))
-        result = self._user_groups_cache.get(username, None)
+        with self._cache_lock:
+            result = self._user_groups_cache.get(username, None)
 
         if result is None:
             LOG.debug('LDAP groups cache for user "%s" is empty' % (username))
@@ -429,4 +927,168 @@ class LDAPAuthenticationBackend(object):
             return None
 
         LOG.debug('Storing groups for user "%s" in cache' % (username))
-        self._user_groups_cache[username] = groups
+        with self._cache_lock:
+            self._user_groups_cache[username] = groups
+
+    def _get_user_from_cache(self, username, cache_key):
+        """
+        Get value from per-user cache (if caching is enabled).
+
+        If the user is found in the negative cache, ValueError is raised.
+        """
+        if not self._cache_user_response:
+            return None
+
+        LOG.debug('Getting LDAP user record for user "%s" from cache' % (username))
+        with self._cache_lock:
+            msg = self._user_negative_cache.get(username, None)
+            result = self._user_cache.get(cache_key, None)
+
+        if msg is not None:
+            LOG.debug('Found LDAP negative cache for user "%s"' % (username))
+            raise ValueError(msg)
+
+        if result is None:
+            LOG.debug('LDAP user cache for user "%s" is empty' % (username))
+        else:
+            LOG.debug('Found LDAP user cache for user "%s"' % (username))
+
+        return result
+
+    def _set_user_in_cache(self, username, cache_key, user_tuple):
+        """
+        Store value in per-user cache (if caching is enabled).
+        """
+        if not self._cache_user_response:
+            return None
+
+        LOG.debug('Storing LDAP user record for user "%s" in cache' % (username))
+        with self._cache_lock:
+            self._user_cache[cache_key] = user_tuple
+
+    def _set_user_in_negative_cache(self, username, msg):
+        """
+        Store a result of failed lookup in per-user negative cache (if caching is enabled).
+        """
+        if not self._cache_user_response:
+            return None
+
+        LOG.debug('Storing user "%s" in negative cache' % (username))
+        with self._cache_lock:
+            self._user_negative_cache[username] = msg
+
+
+class LDAPConnectionPool(object):
+    """
+    Thread-safe pool of LDAP connections which are bound with the service account.
+
+    Establishing a connection (TCP and TLS handshake) and binding with the service account is
+    usually more expensive than the query itself so connections are reused across requests.
+    """
+
+    def __init__(self, connection_factory, max_size=8, bind_func=None):
+        """
+        :param connection_factory: Function which returns a new bound connection.
+        :type connection_factory: ``callable``
+
+        :param max_size: Maximum number of idle connections kept in the pool. If 0, pooling is
+                         disabled and a new connection is used for each request.
+        :type max_size: ``int``
+
+        :param bind_func: Function which binds the provided connection with the service account
+                          again. Used for connections which have been bound with a different
+                          identity before they are returned to the pool.
+        :type bind_func: ``callable``
+        """
+        self._connection_factory = connection_factory
+        self._max_size = max_size
+        self._bind_func = bind_func
+        self._connections = queue.Queue(maxsize=max(max_size, 1))
+
+    def acquire(self):
+        """
+        Retrieve idle connection from the pool or create a new one if pool is empty.
+        """
+        try:
+            return self._connections.get_nowait()
+        except queue.Empty:
+            return self._connection_factory()
+
+    def release(self, connection, rebind=False):
+        """
+        Return connection to the pool. If pool is full, connection is closed.
+
+        :param rebind: True if the connection has been bound with a different identity and needs
+                       to be bound with the service account again before it's reused. If that
+                       fails, connection is closed instead.
+        :type rebind: ``bool``
+        """
+        # Connection which won't be kept is closed right away instead of being bound again
+        if self._max_size <= 0 or self._connections.full():
+            self.discard(connection)
+            return
+
+        if rebind:
+            try:
+                self._bind_func(connection)
+            except Exception:
+                LOG.debug('Failed to bind LDAP connection with the service account',
+                          exc_info=True)
+                self.discard(connection)
+                return
+
+        try:
+            self._connections.put_nowait(connection)
+        except queue.Full:
+            self.discard(connection)
+
+    def discard(self, connection):
+        """
+        Close connection without returning it to the pool.
+        """
+        try:
+            connection.unbind_s()
+        except Exception:
+            LOG.debug('Failed to unbind discarded LDAP connection', exc_info=True)
+
+    def run(self, func, rebind=False, **kwargs):
+        """
+        Call ``func`` with a pooled connection passed in as ``connection`` keyword argument and
+        return the result.
+
+        If the connection turns out to be unusable (e.g. server has closed an idle connection),
+        it's discarded and ``func`` is retried once using a new connection.
+
+        If an operation times out on the client side, the connection is discarded since the
+        operation is still outstanding on the server.
+
+        :param rebind: True if ``func`` changes identity of the connection (e.g. binds with the
+                       user credentials). See :meth:`release`.
+        :type rebind: ``bool``
+        """
+        connection = self.acquire()
+
+        try:
+            result = func(connection=connection, **kwargs)
+        except (ldap.SERVER_DOWN, ldap.CONNECT_ERROR):
+            LOG.debug('Pooled LDAP connection is not usable, retrying with a new connection')
+            self.discard(connection)
+
+            connection = self._connection_factory()
+            try:
+                result = func(connection=connection, **kwargs)
+            except (ldap.SERVER_DOWN, ldap.CONNECT_ERROR, ldap.TIMEOUT):
+                self.discard(connection)
+                raise
+            except Exception:
+                self.release(connection, rebind=rebind)
+                raise
+        except ldap.TIMEOUT:
+            self.discard(connection)
+            raise
+        except Exception:
+            self.release(connection, rebind=rebind)
+            raise
+
+        self.release(connection, rebind=rebind)
+        return result
@@ -20,6 +20,7 @@ import uuid
 import ldap
 import mock
 import unittest2
+from ldap.controls import SimplePagedResultsControl
 
 from st2auth_ldap import ldap_backend
 
@@ -77,6 +78,13 @@ LDAP_USER_SEARCH_RESULT = [('cn=Stormin Stanley,cn=users,dc=stackstorm,dc=net',
 LDAP_GROUP_SEARCH_RESULT = [('cn=testers,dc=stackstorm,dc=net', ()),
                             ('cn=stormers,dc=stackstorm,dc=net', ())]
 
+LDAP_GROUP_SEARCH_RESULT_PAGES = [
+    (ldap.RES_SEARCH_RESULT, [('cn=testers,dc=stackstorm,dc=net', ())], 1,
+     [SimplePagedResultsControl(True, size=1, cookie=b'page2')]),
+    (ldap.RES_SEARCH_RESULT, [('cn=stormers,dc=stackstorm,dc=net', ())], 2,
+     [SimplePagedResultsControl(True, size=1, cookie=b'')])
+]
+
 __all__ = [
     'LDAPBackendTest'
 ]
@@ -100,7 +108,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_authenticate(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -119,7 +127,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_authenticate_with_multiple_ldap_hosts(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -138,7 +146,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_authenticate_without_password(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -173,7 +181,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(side_effect=[None, Exception()]))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_authenticate_failure_bad_user_password(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -192,7 +200,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, []]))
     def test_authenticate_failure_non_group_member_no_groups(self):
         # User is not member of any of the required group
@@ -226,7 +234,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                        [('cn=group1,dc=stackstorm,dc=net', ())]]))
     def test_authenticatefailure_non_group_member_non_required_group(self):
@@ -261,7 +269,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group3,dc=stackstorm,dc=net', ())]]))
@@ -290,7 +298,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group3,dc=stackstorm,dc=net', ())]]))
@@ -317,7 +325,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group2,dc=stackstorm,dc=net', ()),
@@ -349,7 +357,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group2,dc=stackstorm,dc=net', ()),
@@ -381,7 +389,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ())]]))
     def test_authenticate_or_behavior_success_member_of_single_group_1(self):
@@ -406,7 +414,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ())]]))
     def test_authenticate_or_behavior_success_member_of_single_group_2(self):
@@ -434,7 +442,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group3,dc=stackstorm,dc=net', ())]]))
     def test_authenticate_or_behavior_success_member_of_single_group_2b(self):
@@ -462,7 +470,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group4,dc=stackstorm,dc=net', ())]]))
@@ -492,7 +500,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group4,dc=stackstorm,dc=net', ())]]))
@@ -519,7 +527,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group3,dc=stackstorm,dc=net', ()),
@@ -546,7 +554,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ()),
                                      ('cn=group3,dc=stackstorm,dc=net', ()),
@@ -574,7 +582,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_ssl_authenticate(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -595,7 +603,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(side_effect=[None, Exception()]))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_ssl_authenticate_failure(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -616,7 +624,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_ssl_authenticate_validate_cert(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -641,7 +649,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_tls_authenticate(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -664,7 +672,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(side_effect=[None, Exception()]))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_tls_authenticate_failure(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -687,7 +695,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_tls_authenticate_validate_cert(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -708,7 +716,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, []]))
     def test_special_characters_in_username_are_escaped(self):
         # User is not member of any of the required group
@@ -733,25 +741,25 @@ class LDAPBackendTest(unittest2.TestCase):
         for actual_username, expected_username in values:
             backend.authenticate(actual_username, LDAP_USER_BAD_PASSWD)
 
-            call_args_1 = ldap.ldapobject.SimpleLDAPObject.search_s.call_args_list[0][0]
-            call_args_2 = ldap.ldapobject.SimpleLDAPObject.search_s.call_args_list[1][0]
+            call_args_1 = ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_args_list[0][0]
+            call_args_2 = ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_args_list[1][0]
 
-            # First search_s call (find user by uid)
+            # First search_ext_s call (find user by uid)
             filter_call_value = call_args_1[2]
             self.assertEqual(filter_call_value, 'uid=%s' % (expected_username))
 
-            # Second search_s call (group membership test)
+            # Second search_ext_s call (group membership test)
             filter_call_value = call_args_2[2]
             self.assertTrue('(memberUid=%s)' % (expected_username) in filter_call_value)
 
-            ldap.ldapobject.SimpleLDAPObject.search_s = mock.MagicMock(
+            ldap.ldapobject.SimpleLDAPObject.search_ext_s = mock.MagicMock(
                 side_effect=[LDAP_USER_SEARCH_RESULT, []])
 
     @mock.patch.object(
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_get_user(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -773,7 +781,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[2 * LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_get_user_multiple_results(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -792,7 +800,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
     def test_get_user_groups(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
@@ -816,7 +824,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ())],
                                     LDAP_USER_SEARCH_RESULT,
@@ -835,27 +843,28 @@ class LDAPBackendTest(unittest2.TestCase):
             LDAP_HOST,
             id_attr=LDAP_ID_ATTR,
             group_dns_check='or',
-            cache_user_groups_response=False
+            cache_user_groups_response=False,
+            cache_user_response=False
         )
 
-        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_s.call_count, 0)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 0)
 
         authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_BAD_PASSWD)
         self.assertTrue(authenticated)
 
         # 1 for user dn search, 1 for groups search
-        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_s.call_count, 2)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 2)
 
         user_groups = backend.get_user_groups(username=LDAP_USER_UID)
         self.assertEqual(user_groups, ['cn=group1,dc=stackstorm,dc=net'])
-        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_s.call_count, 4)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 4)
         self.assertTrue(backend._user_groups_cache is None)
 
     @mock.patch.object(
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group1,dc=stackstorm,dc=net', ())],
                                     LDAP_USER_SEARCH_RESULT,
@@ -877,22 +886,22 @@ class LDAPBackendTest(unittest2.TestCase):
             cache_user_groups_response=True
         )
 
-        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_s.call_count, 0)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 0)
 
         authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_BAD_PASSWD)
         self.assertTrue(authenticated)
-        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_s.call_count, 2)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 2)
 
         user_groups = backend.get_user_groups(username=LDAP_USER_UID)
         self.assertEqual(user_groups, ['cn=group1,dc=stackstorm,dc=net'])
-        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_s.call_count, 2)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 2)
         self.assertTrue(LDAP_USER_UID in backend._user_groups_cache)
 
     @mock.patch.object(
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT]))
     def test_get_user_specifying_account_pattern(self):
         expected_username = 'unique_username_1'
@@ -927,14 +936,16 @@ class LDAPBackendTest(unittest2.TestCase):
         backend._init_connection = mock.MagicMock(return_value=connection)
         backend.get_user(expected_username)
 
-        connection.search_s.assert_called_once_with(LDAP_BASE_OU, scope_number,
-                                                    expected_account_pattern, [])
+        connection.search_ext_s.assert_called_once_with(LDAP_BASE_OU, scope_number,
+                                                        expected_account_pattern,
+                                                        backend._user_attributes,
+                                                        timeout=5, sizelimit=2)
 
     @mock.patch.object(
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group3,dc=stackstorm,dc=net', ())],
                                     LDAP_USER_SEARCH_RESULT,
@@ -983,14 +994,15 @@ class LDAPBackendTest(unittest2.TestCase):
         backend._get_user_dn = mock.MagicMock(return_value=expected_user_dn)
 
         backend.get_user_groups(expected_username)
-        connection.search_s.assert_called_with(LDAP_BASE_OU, scope_number,
-                                               expected_group_pattern, [])
+        connection.search_ext_s.assert_called_with(LDAP_BASE_OU, scope_number,
+                                                   expected_group_pattern,
+                                                   ldap_backend.NO_ATTRIBUTES)
 
     @mock.patch.object(
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group3,dc=stackstorm,dc=net', ())],
                                     LDAP_USER_SEARCH_RESULT,
@@ -1026,7 +1038,7 @@ class LDAPBackendTest(unittest2.TestCase):
         ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
         mock.MagicMock(return_value=None))
     @mock.patch.object(
-        ldap.ldapobject.SimpleLDAPObject, 'search_s',
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
         mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
                                     [('cn=group3,dc=stackstorm,dc=net', ())],
                                     LDAP_USER_SEARCH_RESULT,
@@ -1047,7 +1059,8 @@ class LDAPBackendTest(unittest2.TestCase):
             id_attr=LDAP_ID_ATTR,
             group_dns_check='or',
             cache_user_groups_response=True,
-            cache_user_groups_cache_ttl=1
+            cache_user_groups_cache_ttl=1,
+            cache_user_response=False
         )
         user_groups = backend.get_user_groups(username=LDAP_USER_UID)
         self.assertEqual(user_groups, ['cn=group3,dc=stackstorm,dc=net'])
@@ -1055,8 +1068,8 @@ class LDAPBackendTest(unittest2.TestCase):
         self.assertEqual(backend._user_groups_cache[LDAP_USER_UID],
                          ['cn=group3,dc=stackstorm,dc=net'])
 
-        # After 1 second, cache entry should expire and it should result in another search_s call
-        # which returns group4
+        # After 1 second, cache entry should expire and it should result in another search_ext_s
+        # call which returns group4
         time.sleep(1.5)
 
         user_groups = backend.get_user_groups(username=LDAP_USER_UID)
@@ -1068,3 +1081,711 @@ class LDAPBackendTest(unittest2.TestCase):
         # Cache should now be empty
         time.sleep(1.5)
         self.assertFalse(LDAP_USER_UID in backend._user_groups_cache)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
+                                    [(LDAP_USER_SEARCH_RESULT[0][0],
+                                      {'memberOf': [b'cn=testers,dc=stackstorm,dc=net',
+                                                    b'CN=stormers, DC=StackStorm, DC=net',
+                                                    b'cn=others,dc=example,dc=net']})]]))
+    def test_get_user_groups_use_memberof_attribute(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            use_memberof_attribute=True
+        )
+
+        expected = [
+            'cn=testers,dc=stackstorm,dc=net',
+            'CN=stormers, DC=StackStorm, DC=net'
+        ]
+
+        # Groups outside of the group base OU should be ignored
+        groups = backend.get_user_groups(username=LDAP_USER_UID)
+        self.assertEqual(groups, expected)
+
+        # Groups should be read from the user record
+        call_args = ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_args_list[1][0]
+        self.assertEqual(call_args, (LDAP_USER_SEARCH_RESULT[0][0], ldap.SCOPE_BASE,
+                                     '(objectClass=*)', ['memberOf']))
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
+                                    [(LDAP_USER_SEARCH_RESULT[0][0], {})],
+                                    LDAP_GROUP_SEARCH_RESULT]))
+    def test_get_user_groups_use_memberof_attribute_fallback_to_group_query(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            use_memberof_attribute=True
+        )
+
+        expected = [
+            'cn=testers,dc=stackstorm,dc=net',
+            'cn=stormers,dc=stackstorm,dc=net'
+        ]
+
+        groups = backend.get_user_groups(username=LDAP_USER_UID)
+        self.assertEqual(groups, expected)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 3)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
+                                    [('cn=testers,dc=stackstorm,dc=net', ())]]))
+    def test_authenticate_group_dn_attribute_only_required_groups_are_queried(self):
+        required_group_dns = [
+            'cn=testers,dc=stackstorm,dc=net',
+            'cn=(stormers),dc=stackstorm,dc=net'
+        ]
+
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            required_group_dns,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            group_dns_check='or',
+            group_dn_attribute='entryDN'
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        filter_call_value = ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_args_list[1][0][2]
+        self.assertTrue(filter_call_value.startswith('(&(|(member='))
+        self.assertTrue(filter_call_value.endswith(
+            '(|(entryDN=cn=testers,dc=stackstorm,dc=net)'
+            '(entryDN=cn=\\28stormers\\29,dc=stackstorm,dc=net)))'))
+
+        # Partial result should not be cached
+        self.assertFalse(LDAP_USER_UID in backend._user_groups_cache)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_USER_SEARCH_RESULT]))
+    def test_service_connection_is_reused(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            cache_user_response=False
+        )
+        backend._init_connection = mock.MagicMock(wraps=backend._init_connection)
+
+        self.assertTrue(backend.get_user(username=LDAP_USER_UID))
+        self.assertTrue(backend.get_user(username=LDAP_USER_UID))
+
+        # Connection should only be established and bound once
+        self.assertEqual(backend._init_connection.call_count, 1)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.simple_bind_s.call_count, 1)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_USER_SEARCH_RESULT]))
+    def test_service_connection_is_not_reused_pooling_disabled(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            connection_pool_max_size=0,
+            cache_user_response=False
+        )
+        backend._init_connection = mock.MagicMock(wraps=backend._init_connection)
+
+        self.assertTrue(backend.get_user(username=LDAP_USER_UID))
+        self.assertTrue(backend.get_user(username=LDAP_USER_UID))
+        self.assertEqual(backend._init_connection.call_count, 2)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=ldap.TIMEOUT()))
+    def test_timed_out_service_connection_is_discarded(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR
+        )
+
+        self.assertIsNone(backend.get_user(username=LDAP_USER_UID))
+
+        # Connection with an outstanding search shouldn't be returned to the pool
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 1)
+        self.assertEqual(backend._connection_pool._connections.qsize(), 0)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, ldap.SERVER_DOWN(),
+                                    LDAP_USER_SEARCH_RESULT]))
+    def test_stale_service_connection_is_discarded(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            cache_user_response=False
+        )
+        backend._init_connection = mock.MagicMock(wraps=backend._init_connection)
+
+        self.assertTrue(backend.get_user(username=LDAP_USER_UID))
+
+        # Pooled connection is stale, query should be retried using a new connection
+        self.assertTrue(backend.get_user(username=LDAP_USER_UID))
+        self.assertEqual(backend._init_connection.call_count, 2)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 3)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_USER_SEARCH_RESULT]))
+    def test_get_user_caching_enabled(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            cache_user_response=True
+        )
+
+        user_info = backend.get_user(username=LDAP_USER_UID)
+        self.assertEqual(user_info['cn'], ['Tomaz Muraus'])
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 1)
+
+        user_info = backend.get_user(username=LDAP_USER_UID)
+        self.assertEqual(user_info['cn'], ['Tomaz Muraus'])
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 1)
+
+        # Invalidating the user should result in another query
+        backend.invalidate_user(username=LDAP_USER_UID)
+
+        user_info = backend.get_user(username=LDAP_USER_UID)
+        self.assertEqual(user_info['cn'], ['Tomaz Muraus'])
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 2)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[[], LDAP_USER_SEARCH_RESULT]))
+    def test_get_user_negative_caching(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            cache_user_response=True,
+            cache_user_negative_cache_ttl=1
+        )
+
+        self.assertIsNone(backend.get_user(username=LDAP_USER_UID))
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 1)
+
+        # Negative result should be served from cache
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertFalse(authenticated)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 1)
+
+        # After 1 second, negative cache entry should expire
+        time.sleep(1.5)
+
+        user_info = backend.get_user(username=LDAP_USER_UID)
+        self.assertEqual(user_info['cn'], ['Tomaz Muraus'])
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 2)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_user_dn_template(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            user_dn_template='uid={username},ou=people,dc=stackstorm,dc=net'
+        )
+
+        authenticated = backend.authenticate('stanley,+', LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # User DN should not be searched for, only group query should be performed
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 1)
+
+        bind_args = ldap.ldapobject.SimpleLDAPObject.simple_bind_s.call_args_list[1][0]
+        self.assertEqual(bind_args, ('uid=stanley\\,\\+,ou=people,dc=stackstorm,dc=net',
+                                     LDAP_USER_PASSWD))
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, ldap.NO_SUCH_OBJECT()]))
+    def test_get_user_user_dn_template(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            user_dn_template='uid={username},ou=people,dc=stackstorm,dc=net'
+        )
+
+        user_info = backend.get_user(username=LDAP_USER_UID)
+        self.assertEqual(user_info['cn'], ['Tomaz Muraus'])
+
+        # User record should be read directly
+        call_args = ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_args_list[0][0]
+        self.assertEqual(call_args[0], 'uid=stanley,ou=people,dc=stackstorm,dc=net')
+        self.assertEqual(call_args[1], ldap.SCOPE_BASE)
+
+        # User which doesn't exist
+        self.assertIsNone(backend.get_user(username=LDAP_USER_UID_2))
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT]))
+    def test_get_user_user_search_scope_and_limits(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            scope='subtree',
+            user_search_scope='onelevel',
+            size_limit=5,
+            time_limit=10
+        )
+
+        user_info = backend.get_user(username=LDAP_USER_UID)
+        self.assertEqual(user_info['cn'], ['Tomaz Muraus'])
+
+        call_args = ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_args_list[0]
+        self.assertEqual(call_args[0][1], ldap.SCOPE_ONELEVEL)
+        self.assertEqual(call_args[1], {'timeout': 10, 'sizelimit': 5})
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=ldap.SIZELIMIT_EXCEEDED()))
+    def test_authenticate_user_query_size_limit_exceeded(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertFalse(authenticated)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_user_bind_reuses_service_connection(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR
+        )
+        backend._init_connection = mock.MagicMock(wraps=backend._init_connection)
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # User should be bound on the pooled connection which is then bound with the service
+        # account again
+        self.assertEqual(backend._init_connection.call_count, 1)
+        bind_args = [call_args[0] for call_args in
+                     ldap.ldapobject.SimpleLDAPObject.simple_bind_s.call_args_list]
+        self.assertEqual(bind_args, [(LDAP_BIND_DN, LDAP_BIND_PASSWORD),
+                                     (LDAP_USER_SEARCH_RESULT[0][0], LDAP_USER_PASSWD),
+                                     (LDAP_BIND_DN, LDAP_BIND_PASSWORD)])
+        self.assertEqual(backend._connection_pool._connections.qsize(), 1)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_user_bind_pooling_disabled(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            connection_pool_max_size=0
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # Connection which is not returned to the pool shouldn't be bound with the service
+        # account again
+        bind_args = [call_args[0] for call_args in
+                     ldap.ldapobject.SimpleLDAPObject.simple_bind_s.call_args_list]
+        self.assertEqual(bind_args[-1], (LDAP_USER_SEARCH_RESULT[0][0], LDAP_USER_PASSWD))
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind',
+        mock.MagicMock(return_value=1))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'result3',
+        mock.MagicMock(return_value=(ldap.RES_BIND, [], 1, [])))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_concurrent_user_bind(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            concurrent_user_bind=True
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # Only service account should be bound synchronously
+        for call_args in ldap.ldapobject.SimpleLDAPObject.simple_bind_s.call_args_list:
+            self.assertEqual(call_args[0], (LDAP_BIND_DN, LDAP_BIND_PASSWORD))
+        ldap.ldapobject.SimpleLDAPObject.simple_bind.assert_called_once_with(
+            LDAP_USER_SEARCH_RESULT[0][0], LDAP_USER_PASSWD)
+        ldap.ldapobject.SimpleLDAPObject.result3.assert_called_once_with(1)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind',
+        mock.MagicMock(side_effect=[ldap.SERVER_DOWN(), 1]))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'result3',
+        mock.MagicMock(return_value=(ldap.RES_BIND, [], 1, [])))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_concurrent_user_bind_stale_connection(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            concurrent_user_bind=True
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # Bind request should be sent again using a new connection
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.simple_bind.call_count, 2)
+        ldap.ldapobject.SimpleLDAPObject.result3.assert_called_once_with(1)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind',
+        mock.MagicMock(return_value=1))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'result3',
+        mock.MagicMock(side_effect=ldap.SERVER_DOWN()))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_concurrent_user_bind_stale_connection_bind_result(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            concurrent_user_bind=True
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # User should be bound synchronously once the bind result can't be retrieved
+        ldap.ldapobject.SimpleLDAPObject.simple_bind_s.assert_any_call(
+            LDAP_USER_SEARCH_RESULT[0][0], LDAP_USER_PASSWD)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind',
+        mock.MagicMock(return_value=1))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'result3',
+        mock.MagicMock(side_effect=ldap.INVALID_CREDENTIALS()))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_concurrent_user_bind_failure_bad_user_password(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            concurrent_user_bind=True
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_BAD_PASSWD)
+        self.assertFalse(authenticated)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'compare_s',
+        mock.MagicMock(side_effect=[ldap.NO_SUCH_ATTRIBUTE(), True]))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT]))
+    def test_authenticate_use_compare_operation(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            use_compare_operation=True
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # Group membership should be verified using compare instead of a group query
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_count, 1)
+        compare_args = [call_args[0] for call_args in
+                        ldap.ldapobject.SimpleLDAPObject.compare_s.call_args_list]
+        self.assertEqual(compare_args, [
+            (LDAP_GROUP_DNS[0], 'member', LDAP_USER_SEARCH_RESULT[0][0]),
+            (LDAP_GROUP_DNS[0], 'uniqueMember', LDAP_USER_SEARCH_RESULT[0][0])
+        ])
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'compare_s',
+        mock.MagicMock(return_value=False))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT]))
+    def test_authenticate_use_compare_operation_not_a_member(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            use_compare_operation=True
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertFalse(authenticated)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.compare_s.call_count,
+                         len(ldap_backend.COMPARE_MEMBERSHIP_ATTRIBUTES))
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT,
+                                    [('CN=Straße,DC=StackStorm,DC=net', ())]]))
+    def test_authenticate_group_dns_are_compared_case_insensitively(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            ['cn=STRASSE,dc=stackstorm,dc=net'],
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT]))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext',
+        mock.MagicMock(side_effect=[1, 2]))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'result3',
+        mock.MagicMock(side_effect=LDAP_GROUP_SEARCH_RESULT_PAGES))
+    def test_get_user_groups_paged_group_query(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            group_query_page_size=1
+        )
+
+        expected = [
+            'cn=testers,dc=stackstorm,dc=net',
+            'cn=stormers,dc=stackstorm,dc=net'
+        ]
+
+        groups = backend.get_user_groups(username=LDAP_USER_UID)
+        self.assertEqual(groups, expected)
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext.call_count, 2)
+
+        # Cookie from the first page should be sent with the second page request
+        page_control = ldap.ldapobject.SimpleLDAPObject.search_ext.call_args[1]['serverctrls'][0]
+        self.assertEqual(page_control.cookie, b'page2')
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT]))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext',
+        mock.MagicMock(side_effect=[1, 2]))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'result3',
+        mock.MagicMock(side_effect=LDAP_GROUP_SEARCH_RESULT_PAGES))
+    def test_authenticate_or_behavior_paged_group_query_stops_early(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            group_dns_check='or',
+            group_query_page_size=1
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        # Required group is on the first page so the second page should not be requested and the
+        # paged search should be abandoned instead
+        self.assertEqual(ldap.ldapobject.SimpleLDAPObject.search_ext.call_count, 2)
+        page_control = ldap.ldapobject.SimpleLDAPObject.search_ext.call_args[1]['serverctrls'][0]
+        self.assertEqual(page_control.size, 0)
+        self.assertEqual(page_control.cookie, b'page2')
+
+        # Partial result should not be cached
+        self.assertFalse(LDAP_USER_UID in backend._user_groups_cache)
+
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'simple_bind_s',
+        mock.MagicMock(return_value=None))
+    @mock.patch.object(
+        ldap.ldapobject.SimpleLDAPObject, 'search_ext_s',
+        mock.MagicMock(side_effect=[LDAP_USER_SEARCH_RESULT, LDAP_GROUP_SEARCH_RESULT]))
+    def test_authenticate_user_query_doesnt_request_attributes(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR
+        )
+
+        authenticated = backend.authenticate(LDAP_USER_UID, LDAP_USER_PASSWD)
+        self.assertTrue(authenticated)
+
+        call_args = ldap.ldapobject.SimpleLDAPObject.search_ext_s.call_args_list[0][0]
+        self.assertEqual(call_args[3], ldap_backend.NO_ATTRIBUTES)
@@ -154,6 +154,56 @@ class LDAPBackendConfigurationTest(unittest2.TestCase):
             scope='foo'
         )
 
+    def test_bad_scope_error_message(self):
+        expected_msg = ('Scope value for the LDAP query must be one of base, onelevel, '
+                        'subtree.')
+        self.assertRaisesRegexp(
+            ValueError,
+            expected_msg,
+            ldap_backend.LDAPAuthenticationBackend,
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            scope='foo'
+        )
+
+    def test_user_search_scope(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            scope='subtree'
+        )
+        self.assertEqual(ldap_backend.SEARCH_SCOPES['subtree'], backend._user_search_scope)
+
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            scope='subtree',
+            user_search_scope='onelevel'
+        )
+        self.assertEqual(ldap_backend.SEARCH_SCOPES['subtree'], backend._scope)
+        self.assertEqual(ldap_backend.SEARCH_SCOPES['onelevel'], backend._user_search_scope)
+
+    def test_bad_user_search_scope(self):
+        self.assertRaises(
+            ValueError,
+            ldap_backend.LDAPAuthenticationBackend,
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            user_search_scope='foo'
+        )
+
     def test_null_id_attr(self):
         backend = ldap_backend.LDAPAuthenticationBackend(
             LDAP_BIND_DN,
@@ -249,6 +299,36 @@ class LDAPBackendConfigurationTest(unittest2.TestCase):
         conn = backend._init_connection()
         self.assertTrue(conn.get_option(ldap.OPT_REFERRALS))
 
+    def test_endpoint_multiple_hosts(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            'ldap1.stackstorm.net,ldap2.stackstorm.net',
+            port=636,
+            use_ssl=True
+        )
+        self.assertEqual(backend._endpoint,
+                         'ldaps://ldap1.stackstorm.net:636,ldaps://ldap2.stackstorm.net:636')
+
+    @mock.patch.dict(ldap_backend.LDAPAuthenticationBackend._applied_tls_options, clear=True)
+    @mock.patch.object(ldap, 'set_option', mock.MagicMock(return_value=None))
+    def test_tls_options_are_set_once(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            use_ssl=True
+        )
+
+        backend._init_connection()
+        backend._init_connection()
+        ldap.set_option.assert_called_once_with(ldap.OPT_X_TLS_REQUIRE_CERT,
+                                                ldap.OPT_X_TLS_NEVER)
+
     def test_client_options(self):
         client_options = {
             ldap.OPT_RESTART: 0,
@@ -268,6 +348,11 @@ class LDAPBackendConfigurationTest(unittest2.TestCase):
             client_options=client_options
         )
 
+        # Option names should be converted once when the backend is instantiated
+        self.assertEqual(sorted(backend._client_options_items),
+                         sorted((int(option_name), option_value)
+                                for option_name, option_value in client_options.items()))
+
         conn = backend._init_connection()
         for option_name, option_value in client_options.items():
             self.assertEqual(conn.get_option(int(option_name)), option_value)
@@ -297,3 +382,83 @@ class LDAPBackendConfigurationTest(unittest2.TestCase):
             id_attr=LDAP_ID_ATTR
         )
         self.assertEqual(backend._group_dns_check, 'and')
+
+    def test_default_user_attributes(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST
+        )
+        self.assertEqual(backend._user_attributes, ['cn', 'mail', 'displayName', 'uid'])
+
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr='sAMAccountName'
+        )
+        self.assertEqual(backend._user_attributes,
+                         ['cn', 'mail', 'displayName', 'sAMAccountName'])
+
+    def test_user_attributes(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            id_attr=LDAP_ID_ATTR,
+            user_attributes=['cn', 'givenName']
+        )
+        self.assertEqual(backend._user_attributes, ['cn', 'givenName'])
+
+    def test_default_group_pattern(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST
+        )
+        self.assertEqual(backend._group_pattern, ldap_backend.USER_GROUP_MEMBERSHIP_QUERY)
+        self.assertFalse('objectClass' in backend._group_pattern)
+
+    def test_group_dns_check_func(self):
+        for group_dns_check in ['and', 'or']:
+            backend = ldap_backend.LDAPAuthenticationBackend(
+                LDAP_BIND_DN,
+                LDAP_BIND_PASSWORD,
+                LDAP_BASE_OU,
+                LDAP_GROUP_DNS,
+                LDAP_HOST,
+                group_dns_check=group_dns_check
+            )
+            self.assertEqual(backend._group_dns_check_func,
+                             ldap_backend.GROUP_DNS_CHECK_FUNCS[group_dns_check])
+
+    def test_use_compare_operation_group_dns_threshold(self):
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            LDAP_GROUP_DNS,
+            LDAP_HOST,
+            use_compare_operation=True
+        )
+        self.assertTrue(backend._use_compare_operation)
+
+        group_dns = ['cn=group%s,dc=stackstorm,dc=net' % (index)
+                     for index in range(ldap_backend.COMPARE_THRESHOLD + 1)]
+        backend = ldap_backend.LDAPAuthenticationBackend(
+            LDAP_BIND_DN,
+            LDAP_BIND_PASSWORD,
+            LDAP_BASE_OU,
+            group_dns,
+            LDAP_HOST,
+            use_compare_operation=True
+        )
+        self.assertFalse(backend._use_compare_operation)